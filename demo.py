@@ -1,13 +1,12 @@
-import os
-from dotenv import load_dotenv
 from src.agent import ClinicalAgent
+from src.config import get_settings
 
 def main():
     # Load environment variables
-    load_dotenv()
+    settings = get_settings()
     
-    api_key = os.getenv("HUGGINGFACE_API_KEY")
-    dry_run = os.getenv("DRY_RUN", "true").lower() == "true"
+    api_key = settings.api_key
+    dry_run = settings.dry_run
     
     if not api_key:
         print("ERROR: HUGGINGFACE_API_KEY not found in .env file")
@@ -31,16 +30,20 @@ def main():
         "Schedule a cardiology follow-up for patient Ravi Kumar next week"
     ]
     
-    for i, request in enumerate(test_requests, 1):
+    # Submit all test requests as one batch
+    responses = agent.process_requests(test_requests)
+    
+    for i, (request, response) in enumerate(zip(test_requests, responses), 1):
         print(f"\n{'='*60}")
         print(f"TEST {i}: {request}")
         print('='*60)
         
-        response = agent.process_request(request)
         print(f"\nResponse:\n{response}")
         
         input("\nPress Enter to continue to next test...")
     
+    agent.close()
+    
     print("\n" + "="*60)
     print("Demo completed! Check the 'logs' folder for audit trail.")
     print("="*60)
@@ -7,5 +7,6 @@ from .agent import ClinicalAgent
 from .functions import ClinicalFunctions
 from .schemas import FUNCTION_SCHEMAS
 from .logger import AuditLogger
+from .config import Settings, get_settings
 
-__all__ = ['ClinicalAgent', 'ClinicalFunctions', 'FUNCTION_SCHEMAS', 'AuditLogger']
\ No newline at end of file
+__all__ = ['ClinicalAgent', 'ClinicalFunctions', 'FUNCTION_SCHEMAS', 'AuditLogger', 'Settings', 'get_settings']
\ No newline at end of file
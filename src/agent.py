@@ -3,20 +3,81 @@ Main LLM Agent - orchestrates function calling workflow
 """
 
 import os
-import json
-from typing import Dict, Any, List
-from huggingface_hub import InferenceClient
-from .schemas import FUNCTION_SCHEMAS
+import re
+import orjson
+import asyncio
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from enum import IntEnum
+from typing import Dict, Any, List, Optional, Tuple
+from huggingface_hub import InferenceClient, AsyncInferenceClient
+from .schemas import FUNCTION_SCHEMAS_JSON, NO_ACTION, TOOL_CALL_SCHEMA
 from .functions import ClinicalFunctions
 from .logger import AuditLogger
+from .config import get_settings
+
+# Seconds the startup warm-up may take before it is abandoned
+WARMUP_TIMEOUT = 5.0
+
+class Intent(IntEnum):
+    """Request intents, in routing priority order"""
+    SEARCH = 0
+    ELIGIBILITY = 1
+    SLOTS = 2
+    BOOK = 3
+    OTHER = 4
+
+# Intents whose handlers only read data and are safe to run together
+_READ_ONLY_INTENTS = frozenset({Intent.SEARCH, Intent.ELIGIBILITY, Intent.SLOTS})
+
+# Functions the LLM fallback may run without confirmation
+_READ_ONLY_FUNCTIONS = frozenset({"search_patient", "check_insurance_eligibility", "find_available_slots"})
+
+# Largest tool call the grammar has to fit. Mistral can spend a token per character
+# (digits are split individually), so the budget is its length plus some slack.
+_LONGEST_TOOL_CALL = orjson.dumps({
+    "name": "find_available_slots",
+    "arguments": {
+        "specialty": "gastroenterology",
+        "date_range_start": "2025-12-23",
+        "date_range_end": "2025-12-30"
+    }
+}, option=orjson.OPT_INDENT_2)
+MAX_TOOL_CALL_TOKENS = len(_LONGEST_TOOL_CALL) + 32
+
+# One alternation over every routing keyword; the group index is the intent
+_INTENT_RE = re.compile(
+    r"(search|find patient)|(insurance|eligibility)|(slots|available)|(book|schedule)"
+)
+
+# First run of capitalized words (names or IDs) after the sentence-initial word
+_CAP_WORDS_RE = re.compile(r"(?<=\s)[A-Z][A-Za-z0-9]*(?:\s+[A-Z][A-Za-z0-9]*)*")
+
+def _classify_all(request_lower: str) -> List[Intent]:
+    """Return every intent in a lowercased request, in priority order, from a single scan"""
+    groups = {match.lastindex for match in _INTENT_RE.finditer(request_lower)}
+    return [Intent(group - 1) for group in sorted(groups)]
 
 class ClinicalAgent:
     """LLM Agent for clinical workflow automation"""
     
-    def __init__(self, api_key: str, dry_run: bool = True):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        dry_run: Optional[bool] = None,
+        warmup: bool = True
+    ):
+        # Unset arguments come from the environment
+        settings = get_settings()
+        if api_key is None:
+            api_key = settings.api_key
+        if dry_run is None:
+            dry_run = settings.dry_run
+        
+        self.api_key = api_key
         self.client = InferenceClient(token=api_key)
-        self.functions = ClinicalFunctions(dry_run=dry_run)
         self.logger = AuditLogger()
+        self.functions = ClinicalFunctions(dry_run=dry_run, logger=self.logger)
         self.dry_run = dry_run
         
         # System prompt
@@ -38,6 +99,73 @@ When calling functions:
 - Confirm actions before booking appointments
 
 Available functions: search_patient, check_insurance_eligibility, find_available_slots, book_appointment"""
+        
+        # Shared generation settings for sync and batched calls.
+        # Output is constrained to a single tool call, so the budget only has to fit one.
+        self._generation_kwargs = {
+            "model": "mistralai/Mistral-7B-Instruct-v0.2",
+            "max_new_tokens": MAX_TOOL_CALL_TOKENS,
+            "temperature": 0.1,
+            "return_full_text": False,
+            "grammar": {"type": "json", "value": TOOL_CALL_SCHEMA}
+        }
+        
+        # Static prompt prefix, built once so the server can reuse its KV cache.
+        # The varying user request always goes last.
+        self._prompt_prefix = f"""{self.system_prompt}
+
+Available Functions (JSON Schema):
+{FUNCTION_SCHEMAS_JSON}
+
+Think step by step:
+1. What is the user asking for?
+2. Which functions do I need to call?
+3. What parameters do I need?
+4. What is the order of operations?
+
+Respond with a single JSON object giving the function "name" and its "arguments".
+If no function applies, use the name "{NO_ACTION}" with empty arguments.
+
+User Request: """
+        
+        # Intent -> handler routing table for _handle_request
+        self._dispatch = {
+            Intent.SEARCH: self._do_search,
+            Intent.ELIGIBILITY: self._do_eligibility,
+            Intent.SLOTS: self._do_slots,
+            Intent.BOOK: self._do_book
+        }
+        
+        # Runs read-only tool calls concurrently when a request has several intents
+        self._executor = ThreadPoolExecutor(max_workers=len(_READ_ONLY_INTENTS))
+        
+        # Dry runs and keyless agents never need a warm server-side cache
+        if warmup and not dry_run and api_key:
+            self._warmup()
+    
+    def _warmup(self):
+        """Send a tiny request to seed the server-side prefix cache"""
+        parameters = {"model": self._generation_kwargs["model"], "max_new_tokens": 1}
+        try:
+            # Short-lived client so a slow server cannot stall startup
+            InferenceClient(token=self.api_key, timeout=WARMUP_TIMEOUT).text_generation(
+                self._prompt_prefix + "ping",
+                **parameters
+            )
+        except Exception as e:
+            # Warm-up is best effort, but failures still go to the audit trail
+            self.logger.log_action(
+                action_type="WARMUP",
+                function_name="text_generation",
+                parameters=parameters,
+                result=None,
+                success=False,
+                error=str(e)
+            )
+    
+    def close(self):
+        """Release the worker threads used for concurrent tool calls"""
+        self._executor.shutdown(wait=True)
     
     def _call_function(self, function_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Execute a function call"""
@@ -58,89 +186,196 @@ Available functions: search_patient, check_insurance_eligibility, find_available
         """Parse function calls from LLM response"""
         function_calls = []
         
-        # Look for function call patterns in response
-        if "search_patient" in response_text.lower():
-            # Simple parsing - in production use proper JSON extraction
+        # Generation is grammar-constrained, so the response is a JSON tool call
+        try:
+            call = orjson.loads(response_text)
+        except orjson.JSONDecodeError:
+            return function_calls
+        
+        if isinstance(call, dict) and isinstance(call.get("name"), str) and call["name"] != NO_ACTION:
             function_calls.append({
-                "name": "search_patient",
-                "arguments": {"query": "extracted_from_text"}
+                "name": call["name"],
+                "arguments": call.get("arguments") or {}
             })
         
         return function_calls
     
-    def process_request(self, user_request: str) -> str:
-        """Process a user request and return structured response"""
+    def _build_prompt(self, user_request: str) -> str:
+        """Build the function calling prompt for a user request"""
+        return self._prompt_prefix + user_request
+    
+    def _prepare_request(self, user_request: str) -> Tuple[List[Intent], Optional[str]]:
+        """Log and classify a request, returning its intents and, if needed, an LLM prompt"""
         self.logger.log_user_request(user_request)
         
+        # Classified once here; the intents are passed on to _handle_request
+        intents = _classify_all(user_request.lower())
+        
+        # Keyword-routed requests never use the LLM output, so only prompt otherwise
+        if intents:
+            return intents, None
+        
         # Build the prompt for function calling
-        prompt = f"""{self.system_prompt}
-
-User Request: {user_request}
-
-Available Functions (JSON Schema):
-{json.dumps(FUNCTION_SCHEMAS, indent=2)}
-
-Think step by step:
-1. What is the user asking for?
-2. Which functions do I need to call?
-3. What parameters do I need?
-4. What is the order of operations?
-
-Respond with your reasoning and then specify which functions to call."""
+        return intents, self._build_prompt(user_request)
+    
+    def _finish_request(
+        self,
+        user_request: str,
+        intents: List[Intent],
+        llm_response: Optional[str]
+    ) -> str:
+        """Route a request and log the agent response"""
+        # For this POC, we'll create a simple response
+        # In production, you'd parse the LLM response for function calls
+        result = self._handle_request(user_request, intents, llm_response)
+        
+        self.logger.log_agent_response(result)
+        return result
+    
+    def _fail_request(self, error: Exception) -> str:
+        """Log and return the response for a failed request"""
+        error_msg = f"Error processing request: {str(error)}"
+        self.logger.log_agent_response(error_msg)
+        return error_msg
+    
+    def process_request(self, user_request: str) -> str:
+        """Process a user request and return structured response"""
+        intents, prompt = self._prepare_request(user_request)
         
         try:
-            # Call HuggingFace LLM
-            response = self.client.text_generation(
-                prompt,
-                model="mistralai/Mistral-7B-Instruct-v0.2",
-                max_new_tokens=500,
-                temperature=0.1,
-                return_full_text=False
-            )
+            response = None
+            if prompt is not None:
+                # Call HuggingFace LLM
+                response = self.client.text_generation(prompt, **self._generation_kwargs)
             
-            # For this POC, we'll create a simple response
-            # In production, you'd parse the LLM response for function calls
-            result = self._handle_request(user_request, response)
+            return self._finish_request(user_request, intents, response)
+        
+        except Exception as e:
+            return self._fail_request(e)
+    
+    def process_requests(self, user_requests: List[str]) -> List[str]:
+        """Process several user requests concurrently, returning responses in order.
+        
+        Runs its own event loop via asyncio.run, so it cannot be called from code that
+        is already inside a running loop (notebooks, async callers); await
+        aprocess_requests there instead.
+        """
+        return asyncio.run(self.aprocess_requests(user_requests))
+    
+    async def aprocess_requests(self, user_requests: List[str]) -> List[str]:
+        """Async variant of process_requests, submitting all prompts over one client"""
+        prepared = [self._prepare_request(request) for request in user_requests]
+        
+        # Client is opened per batch so its HTTP session is bound to the running loop
+        # and closed with it; batches that never reach the LLM skip it entirely
+        needs_llm = any(prompt is not None for _, prompt in prepared)
+        client_context = (
+            AsyncInferenceClient(token=self.api_key) if needs_llm else contextlib.nullcontext()
+        )
+        
+        async with client_context as client:
+            return await asyncio.gather(*(
+                self._process_request_async(client, request, intents, prompt)
+                for request, (intents, prompt) in zip(user_requests, prepared)
+            ))
+    
+    async def _process_request_async(
+        self,
+        client: Optional[AsyncInferenceClient],
+        user_request: str,
+        intents: List[Intent],
+        prompt: Optional[str]
+    ) -> str:
+        """Async counterpart of process_request for a request already prepared in a batch"""
+        try:
+            response = None
+            if prompt is not None:
+                response = await client.text_generation(prompt, **self._generation_kwargs)
             
-            self.logger.log_agent_response(result)
-            return result
+            # Tool calls are synchronous, so keep them off the event loop
+            return await asyncio.to_thread(self._finish_request, user_request, intents, response)
         
         except Exception as e:
-            error_msg = f"Error processing request: {str(e)}"
-            self.logger.log_agent_response(error_msg)
-            return error_msg
+            return self._fail_request(e)
     
-    def _handle_request(self, user_request: str, llm_response: str) -> str:
-        """Handle request based on keywords (simplified for POC)"""
-        request_lower = user_request.lower()
+    def _handle_request(
+        self,
+        user_request: str,
+        intents: List[Intent],
+        llm_response: Optional[str]
+    ) -> str:
+        """Handle request based on its keyword intents (simplified for POC).
         
+        Keyword-routed responses are always a JSON object keyed by intent name
+        ("search", "eligibility", "slots", "book"), however many intents matched.
+        """
         # Simple keyword-based routing for POC
-        if "search" in request_lower or "find patient" in request_lower:
-            # Extract patient name
-            words = user_request.split()
-            query = " ".join([w for w in words if w[0].isupper()])
-            result = self.functions.search_patient(query)
-            return json.dumps(result, indent=2)
-        
-        elif "insurance" in request_lower or "eligibility" in request_lower:
-            # Mock call
-            result = self.functions.check_insurance_eligibility("P001", "cardiology")
-            return json.dumps(result, indent=2)
-        
-        elif "slots" in request_lower or "available" in request_lower:
-            specialty = "cardiology" if "cardio" in request_lower else "general"
-            result = self.functions.find_available_slots(
-                specialty=specialty,
-                date_range_start="2025-12-23"
-            )
-            return json.dumps(result, indent=2)
+        if not intents:
+            return self._default(user_request, llm_response)
         
-        elif "book" in request_lower or "schedule" in request_lower:
-            result = self.functions.book_appointment("P001", "SLOT_CAR_2025122309")
-            return json.dumps(result, indent=2)
+        # Booking writes data, so it only runs when it is the sole intent and never
+        # because a keyword like "booked" appears alongside a lookup
+        if len(intents) > 1:
+            intents = [intent for intent in intents if intent in _READ_ONLY_INTENTS]
         
+        if len(intents) == 1:
+            intent = intents[0]
+            result = {intent.name.lower(): self._dispatch[intent](user_request, llm_response)}
         else:
-            return f"""Based on your request: "{user_request}"
+            # Read-only lookups are independent, so run them together
+            futures = {
+                intent.name.lower(): self._executor.submit(
+                    self._dispatch[intent], user_request, llm_response
+                )
+                for intent in intents
+            }
+            result = {name: future.result() for name, future in futures.items()}
+        
+        return orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()
+    
+    def _do_search(self, user_request: str, llm_response: Optional[str]) -> Dict[str, Any]:
+        """Search for the patient named in the request"""
+        # Extract patient name
+        match = _CAP_WORDS_RE.search(user_request)
+        query = match.group(0) if match else user_request
+        return self.functions.search_patient(query)
+    
+    def _do_eligibility(self, user_request: str, llm_response: Optional[str]) -> Dict[str, Any]:
+        """Check insurance eligibility"""
+        # Mock call
+        return self.functions.check_insurance_eligibility("P001", "cardiology")
+    
+    def _do_slots(self, user_request: str, llm_response: Optional[str]) -> Dict[str, Any]:
+        """Find available slots for the requested specialty"""
+        specialty = "cardiology" if "cardio" in user_request.lower() else "general"
+        return self.functions.find_available_slots(
+            specialty=specialty,
+            date_range_start="2025-12-23"
+        )
+    
+    def _do_book(self, user_request: str, llm_response: Optional[str]) -> Dict[str, Any]:
+        """Book an appointment"""
+        return self.functions.book_appointment("P001", "SLOT_CAR_2025122309")
+    
+    def _default(self, user_request: str, llm_response: str) -> str:
+        """Handle requests that match no routing keyword"""
+        # Fall back to the tool call chosen by the LLM
+        function_calls = self._parse_function_calls(llm_response)
+        if function_calls:
+            call = function_calls[0]
+            
+            # Writes proposed by the LLM are returned for confirmation, never run
+            if call["name"] not in _READ_ONLY_FUNCTIONS:
+                result = {
+                    "status": "CONFIRMATION_REQUIRED",
+                    "message": f"Please confirm before running {call['name']}",
+                    "proposed_call": call
+                }
+            else:
+                result = self._call_function(call["name"], call["arguments"])
+            return orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()
+        
+        return f"""Based on your request: "{user_request}"
 
 I understand you want help with clinical workflow automation.
 
@@ -4,10 +4,23 @@ In production, these would call actual FHIR or EHR APIs
 """
 
 import uuid
-from datetime import datetime, timedelta
+import functools
+import threading
+from collections import defaultdict
+from datetime import date, datetime, timedelta
 from typing import List, Optional
 from .schemas import Patient, InsuranceEligibility, AppointmentSlot, Appointment
 
+# Mock provider roster per specialty
+PROVIDERS = {
+    "cardiology": ["Dr. Reddy", "Dr. Mehta"],
+    "orthopedics": ["Dr. Singh", "Dr. Gupta"],
+    "general": ["Dr. Kumar", "Dr. Sharma"]
+}
+
+SLOT_HOURS = (9, 11, 14, 16)
+MAX_SLOTS = 10
+
 class MockHealthcareAPI:
     """Simulates a healthcare system API with realistic data"""
     
@@ -38,6 +51,24 @@ class MockHealthcareAPI:
         }
         
         self.appointments = {}
+        # Guards the check-then-insert in book_appointment against concurrent callers
+        self._booking_lock = threading.Lock()
+        
+        # Lowercased name -> patient ID, built once so searches skip re-lowercasing
+        self._name_index = {}
+        # Lowercased name token -> IDs of patients whose name contains it
+        self._name_tokens = defaultdict(set)
+        for patient_id, patient in self.patients.items():
+            name_lower = patient.name.lower()
+            self._name_index.setdefault(name_lower, patient_id)
+            for token in name_lower.split():
+                self._name_tokens[token].add(patient_id)
+        
+        # The patient database is fixed after construction, so these lookups are deterministic
+        self.search_patient = functools.lru_cache(maxsize=256)(self.search_patient)
+        self.check_insurance_eligibility = functools.lru_cache(maxsize=256)(
+            self.check_insurance_eligibility
+        )
         
     def search_patient(self, query: str) -> Optional[Patient]:
         """Search for a patient by name or ID"""
@@ -47,10 +78,17 @@ class MockHealthcareAPI:
         if query.upper() in self.patients:
             return self.patients[query.upper()]
         
-        # Search by name
-        for patient in self.patients.values():
-            if query_lower in patient.name.lower():
-                return patient
+        # Search by name tokens: every query token must appear in the name
+        tokens = query_lower.split()
+        if tokens:
+            matches = set.intersection(*(self._name_tokens.get(token, set()) for token in tokens))
+            if matches:
+                return self.patients[min(matches)]
+        
+        # Fall back to partial name match
+        for name, patient_id in self._name_index.items():
+            if query_lower in name:
+                return self.patients[patient_id]
         
         return None
     
@@ -80,63 +118,70 @@ class MockHealthcareAPI:
         """Find available appointment slots"""
         slots = []
         
-        start_date = datetime.strptime(date_range_start, "%Y-%m-%d")
+        start_date = date.fromisoformat(date_range_start)
         end_date = start_date + timedelta(days=7)
         
         if date_range_end:
-            end_date = datetime.strptime(date_range_end, "%Y-%m-%d")
+            end_date = date.fromisoformat(date_range_end)
         
         # Generate mock slots
-        providers = {
-            "cardiology": ["Dr. Reddy", "Dr. Mehta"],
-            "orthopedics": ["Dr. Singh", "Dr. Gupta"],
-            "general": ["Dr. Kumar", "Dr. Sharma"]
-        }
-        
-        provider_list = providers.get(specialty.lower(), ["Dr. Available"])
+        provider_list = PROVIDERS.get(specialty.lower(), ["Dr. Available"])
+        specialty_name = specialty.capitalize()
+        slot_prefix = f"SLOT_{specialty[:3].upper()}_"
         
         current_date = start_date
-        while current_date <= end_date:
-            if current_date.weekday() < 5:  # Monday to Friday
-                for hour in [9, 11, 14, 16]:
-                    slot_time = current_date.replace(hour=hour, minute=0, second=0)
-                    slot_id = f"SLOT_{specialty[:3].upper()}_{slot_time.strftime('%Y%m%d%H')}"
-                    
-                    slots.append(AppointmentSlot(
-                        slot_id=slot_id,
-                        datetime=slot_time.isoformat(),
-                        provider_name=provider_list[len(slots) % len(provider_list)],
-                        specialty=specialty.capitalize(),
-                        duration_minutes=30
-                    ))
+        while current_date <= end_date and len(slots) < MAX_SLOTS:
+            if current_date.weekday() >= 5:  # Skip Saturday and Sunday
+                current_date += timedelta(days=1)
+                continue
+            
+            # Date parts of the slot ID and timestamp are shared by every hour of the day
+            year, month, day = current_date.year, current_date.month, current_date.day
+            day_prefix = f"{slot_prefix}{year:04d}{month:02d}{day:02d}"
+            day_iso = f"{year:04d}-{month:02d}-{day:02d}"
+            
+            for hour in SLOT_HOURS:
+                if len(slots) >= MAX_SLOTS:
+                    break
+                
+                # Internal data is already well-formed, so skip validation
+                slots.append(AppointmentSlot.model_construct(
+                    slot_id=f"{day_prefix}{hour:02d}",
+                    datetime=f"{day_iso}T{hour:02d}:00:00",
+                    provider_name=provider_list[len(slots) % len(provider_list)],
+                    specialty=specialty_name,
+                    duration_minutes=30
+                ))
             
             current_date += timedelta(days=1)
         
-        return slots[:10]  # Return first 10 slots
+        return slots
     
     def book_appointment(self, patient_id: str, slot_id: str) -> Appointment:
         """Book an appointment for a patient"""
         if patient_id not in self.patients:
             raise ValueError(f"Patient {patient_id} not found")
         
-        # Check if slot is already booked
-        if slot_id in self.appointments:
-            raise ValueError(f"Slot {slot_id} is already booked")
-        
-        # Extract info from slot_id
-        specialty = slot_id.split('_')[1]
-        
-        # Create appointment
-        appointment = Appointment(
-            appointment_id=f"APT_{uuid.uuid4().hex[:8].upper()}",
-            patient_id=patient_id,
-            slot_id=slot_id,
-            datetime=datetime.now().isoformat(),
-            provider_name="Dr. Assigned",
-            specialty=specialty,
-            status="scheduled",
-            created_at=datetime.now().isoformat()
-        )
+        with self._booking_lock:
+            # Check if slot is already booked
+            if slot_id in self.appointments:
+                raise ValueError(f"Slot {slot_id} is already booked")
+            
+            # Extract info from slot_id
+            specialty = slot_id.split('_')[1]
+            
+            # Create appointment
+            appointment = Appointment(
+                appointment_id=f"APT_{uuid.uuid4().hex[:8].upper()}",
+                patient_id=patient_id,
+                slot_id=slot_id,
+                datetime=datetime.now().isoformat(),
+                provider_name="Dr. Assigned",
+                specialty=specialty,
+                status="scheduled",
+                created_at=datetime.now().isoformat()
+            )
+            
+            self.appointments[slot_id] = appointment
         
-        self.appointments[slot_id] = appointment
         return appointment
\ No newline at end of file
@@ -0,0 +1,24 @@
+"""
+Runtime settings - environment and .env parsing, done once per process
+"""
+
+import os
+import functools
+from dataclasses import dataclass
+from typing import Optional
+from dotenv import load_dotenv
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """Settings read from the environment"""
+    api_key: Optional[str]
+    dry_run: bool
+
+@functools.lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load .env and return the parsed settings, cached after the first call"""
+    load_dotenv()
+    return Settings(
+        api_key=os.getenv("HUGGINGFACE_API_KEY"),
+        dry_run=os.getenv("DRY_RUN", "true").lower() == "true"
+    )
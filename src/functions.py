@@ -3,16 +3,16 @@ Tool definitions - these are the functions the LLM agent can call
 """
 
 import os
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 from .api_client import MockHealthcareAPI
 from .logger import AuditLogger
 
 class ClinicalFunctions:
     """Wrapper for clinical workflow functions"""
     
-    def __init__(self, dry_run: bool = True):
+    def __init__(self, dry_run: bool = True, logger: Optional[AuditLogger] = None):
         self.api = MockHealthcareAPI()
-        self.logger = AuditLogger()
+        self.logger = logger or AuditLogger()
         self.dry_run = dry_run
     
     def search_patient(self, query: str) -> Dict[str, Any]:
@@ -94,7 +94,8 @@ class ClinicalFunctions:
                 }
             else:
                 slots = self.api.find_available_slots(specialty, date_range_start, date_range_end)
-                result = {"slots": [slot.model_dump() for slot in slots], "count": len(slots)}
+                # Slots are built internally without validation, so copy their fields directly
+                result = {"slots": [dict(slot.__dict__) for slot in slots], "count": len(slots)}
             
             self.logger.log_action(
                 action_type="FIND_SLOTS",
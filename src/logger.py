@@ -3,18 +3,124 @@ Audit logger for compliance and tracking
 Every action must be logged for healthcare compliance
 """
 
+import atexit
+import functools
 import json
+import orjson
 import os
+import queue
+import sys
+import threading
+import time
 from datetime import datetime
 from typing import Any, Dict
 
+# Maximum number of records combined into a single write
+BATCH_SIZE = 64
+
+# Seconds to wait at exit for pending records before giving up
+FLUSH_TIMEOUT = 5.0
+
+# Queued by _flush_and_close to stop the drain thread
+_CLOSE = object()
+
+class _LogSink:
+    """Shared writer for one log directory: an open handle drained by a background thread"""
+    
+    def __init__(self, log_dir: str):
+        os.makedirs(log_dir, exist_ok=True)
+        self.log_file = os.path.join(log_dir, f"audit_{datetime.now().strftime('%Y%m%d')}.jsonl")
+        
+        # Records are written in batches by a background thread over one open handle
+        self._fh = open(self.log_file, "ab", buffering=1 << 16)
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+        atexit.register(self._flush_and_close)
+    
+    def put(self, record: Dict[str, Any]):
+        """Queue a record for writing"""
+        self._queue.put(record)
+    
+    def join(self):
+        """Block until every queued record has been written"""
+        self._queue.join()
+    
+    def _drain(self):
+        """Write queued records to the log file in batches until closed"""
+        while True:
+            records = [self._queue.get()]
+            while len(records) < BATCH_SIZE:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            try:
+                self._fh.write(b"".join(
+                    self._serialize(r) for r in records if r is not _CLOSE
+                ))
+                self._fh.flush()
+            except Exception as e:
+                # Keep draining; a failed write must not stop later records
+                print(f"[AUDIT LOG ERROR] Failed to write {len(records)} records: {e}", file=sys.stderr)
+            finally:
+                for _ in records:
+                    self._queue.task_done()
+            
+            if any(r is _CLOSE for r in records):
+                return
+    
+    def _serialize(self, record: Dict[str, Any]) -> bytes:
+        """Serialize one record with orjson, then stdlib json, then as a repr line"""
+        entry = self._with_timestamp(record)
+        try:
+            return orjson.dumps(entry, default=str, option=orjson.OPT_NON_STR_KEYS) + b"\n"
+        except orjson.JSONEncodeError:
+            pass
+        
+        try:
+            # Stdlib json still handles what orjson rejects, such as ints wider than 64 bits
+            return json.dumps(entry, default=str).encode() + b"\n"
+        except Exception as e:
+            # Never drop an audit event: keep its repr alongside the failure
+            timestamp = entry.pop("timestamp")
+            return orjson.dumps({
+                "timestamp": timestamp,
+                "type": "log_serialization_error",
+                "error": str(e),
+                "record": repr(entry)
+            }) + b"\n"
+    
+    @staticmethod
+    def _with_timestamp(record: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace the raw nanosecond clock reading with an ISO timestamp"""
+        ts_ns = record.pop("ts_ns")
+        return {"timestamp": datetime.fromtimestamp(ts_ns / 1e9).isoformat(), **record}
+    
+    def _flush_and_close(self):
+        """Write pending records and close the log file, waiting at most FLUSH_TIMEOUT"""
+        self._queue.put(_CLOSE)
+        self._thread.join(timeout=FLUSH_TIMEOUT)
+        
+        # A drain thread stuck in a write still owns the handle, so leave it open
+        if not self._thread.is_alive():
+            self._fh.close()
+
+@functools.lru_cache(maxsize=None)
+def _get_sink(log_dir: str) -> _LogSink:
+    """Return the process-wide sink for an absolute log directory, creating it on first use"""
+    return _LogSink(log_dir)
+
 class AuditLogger:
     """Logger for tracking all agent actions"""
     
     def __init__(self, log_dir: str = "logs"):
         self.log_dir = log_dir
-        os.makedirs(log_dir, exist_ok=True)
-        self.log_file = os.path.join(log_dir, f"audit_{datetime.now().strftime('%Y%m%d')}.jsonl")
+        # Only the first logger for a directory touches the filesystem. The path is
+        # made absolute so loggers created after a chdir get their own sink.
+        self._sink = _get_sink(os.path.abspath(log_dir))
+        self.log_file = self._sink.log_file
     
     def log_action(
         self, 
@@ -27,17 +133,17 @@ class AuditLogger:
     ):
         """Log a function call action"""
         log_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "ts_ns": time.time_ns(),
             "action_type": action_type,
             "function_name": function_name,
-            "parameters": parameters,
+            # Snapshot now; the record is serialized later on the drain thread
+            "parameters": dict(parameters) if parameters is not None else None,
             "result": str(result) if result else None,
             "success": success,
             "error": error
         }
         
-        with open(self.log_file, "a") as f:
-            f.write(json.dumps(log_entry) + "\n")
+        self._sink.put(log_entry)
         
         # Also print to console for visibility
         status = "✓" if success else "✗"
@@ -46,26 +152,24 @@ class AuditLogger:
     def log_user_request(self, request: str):
         """Log the original user request"""
         log_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "ts_ns": time.time_ns(),
             "type": "user_request",
             "request": request
         }
         
-        with open(self.log_file, "a") as f:
-            f.write(json.dumps(log_entry) + "\n")
+        self._sink.put(log_entry)
         
         print(f"\n[USER REQUEST] {request}\n")
     
     def log_agent_response(self, response: str):
         """Log the agent's final response"""
         log_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "ts_ns": time.time_ns(),
             "type": "agent_response",
             "response": response
         }
         
-        with open(self.log_file, "a") as f:
-            f.write(json.dumps(log_entry) + "\n")
+        self._sink.put(log_entry)
         
         print(f"\n[AGENT RESPONSE]\n{response}\n")
     
@@ -74,7 +178,11 @@ class AuditLogger:
         if not os.path.exists(self.log_file):
             return []
         
-        with open(self.log_file, "r") as f:
+        # Make sure everything logged so far has reached the file
+        self._sink.join()
+        
+        with open(self.log_file, "rb") as f:
             lines = f.readlines()
         
+        # Stdlib json reads back wide ints exactly; orjson would turn them into floats
         return [json.loads(line) for line in lines[-limit:]]
\ No newline at end of file
@@ -2,12 +2,16 @@
 JSON schemas for function calling - FHIR-inspired healthcare data structures
 """
 
-from pydantic import BaseModel, Field
-from typing import Optional, List
+import copy
+import orjson
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Final, Optional, List
 from datetime import datetime
 
 class Patient(BaseModel):
     """Patient information schema"""
+    model_config = ConfigDict(extra="forbid")
+    
     patient_id: str = Field(description="Unique patient identifier")
     name: str = Field(description="Patient full name")
     date_of_birth: str = Field(description="Date of birth in YYYY-MM-DD format")
@@ -16,6 +20,8 @@ class Patient(BaseModel):
 
 class InsuranceEligibility(BaseModel):
     """Insurance eligibility response"""
+    model_config = ConfigDict(extra="forbid")
+    
     patient_id: str
     is_eligible: bool
     insurance_provider: str
@@ -25,6 +31,8 @@ class InsuranceEligibility(BaseModel):
 
 class AppointmentSlot(BaseModel):
     """Available appointment slot"""
+    model_config = ConfigDict(extra="forbid")
+    
     slot_id: str
     datetime: str = Field(description="Appointment datetime in ISO format")
     provider_name: str
@@ -33,6 +41,8 @@ class AppointmentSlot(BaseModel):
 
 class Appointment(BaseModel):
     """Booked appointment"""
+    model_config = ConfigDict(extra="forbid")
+    
     appointment_id: str
     patient_id: str
     slot_id: str
@@ -43,7 +53,7 @@ class Appointment(BaseModel):
     created_at: str
 
 # Function schemas for LLM
-FUNCTION_SCHEMAS = [
+FUNCTION_SCHEMAS: Final[List[dict]] = [
     {
         "name": "search_patient",
         "description": "Search for a patient by name or ID in the hospital system",
@@ -116,4 +126,36 @@ FUNCTION_SCHEMAS = [
             "required": ["patient_id", "slot_id"]
         }
     }
-]
\ No newline at end of file
+]
+
+# Serialized once at import for embedding in prompts; a snapshot, so later
+# changes to FUNCTION_SCHEMAS are not reflected here
+FUNCTION_SCHEMAS_JSON: Final[str] = orjson.dumps(FUNCTION_SCHEMAS, option=orjson.OPT_INDENT_2).decode()
+
+# Tool call name the LLM uses when no function applies
+NO_ACTION = "none"
+
+# JSON schema for a single tool call, used to constrain LLM output
+TOOL_CALL_SCHEMA = {
+    "oneOf": [
+        {
+            "type": "object",
+            "properties": {
+                "name": {"const": NO_ACTION},
+                "arguments": {"type": "object", "properties": {}}
+            },
+            "required": ["name", "arguments"]
+        }
+    ] + [
+        {
+            "type": "object",
+            "properties": {
+                "name": {"const": schema["name"]},
+                # Copied so the grammar shares no mutable state with FUNCTION_SCHEMAS
+                "arguments": copy.deepcopy(schema["parameters"])
+            },
+            "required": ["name", "arguments"]
+        }
+        for schema in FUNCTION_SCHEMAS
+    ]
+}
\ No newline at end of file
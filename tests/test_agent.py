@@ -0,0 +1,159 @@
+import asyncio
+import json
+
+import pytest
+
+import src.agent
+from src.agent import ClinicalAgent
+
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    agent = ClinicalAgent(api_key="test-key", dry_run=False, warmup=False)
+    yield agent
+    agent.close()
+
+
+def test_multi_intent_runs_lookups_together(agent):
+    response = json.loads(agent.process_request(
+        "Search for Ravi Kumar and check insurance eligibility"
+    ))
+
+    assert set(response) == {"search", "eligibility"}
+    assert response["search"]["patient_id"] == "P001"
+    assert response["eligibility"]["is_eligible"] is True
+
+
+def test_booking_keyword_alongside_search_does_not_book(agent):
+    response = json.loads(agent.process_request("Search for Ravi Kumar's booked appointments"))
+
+    assert set(response) == {"search"}
+    assert response["search"]["patient_id"] == "P001"
+    assert agent.functions.api.appointments == {}
+
+
+def test_booking_keyword_alongside_slots_does_not_book(agent):
+    response = json.loads(agent.process_request("Are cardiology slots available or fully booked?"))
+
+    assert set(response) == {"slots"}
+    assert response["slots"]["count"] == 10
+    assert agent.functions.api.appointments == {}
+
+
+def test_booking_runs_when_it_is_the_only_intent(agent):
+    response = json.loads(agent.process_request("Book a cardiology appointment for P001"))
+
+    assert response["book"]["status"] == "scheduled"
+    assert "SLOT_CAR_2025122309" in agent.functions.api.appointments
+
+
+def test_async_batch_matches_sync_routing(agent):
+    responses = asyncio.run(agent.aprocess_requests([
+        "Search for Ravi Kumar and check insurance eligibility",
+        "Are cardiology slots available or fully booked?"
+    ]))
+
+    assert set(json.loads(responses[0])) == {"search", "eligibility"}
+    assert json.loads(responses[1])["slots"]["count"] == 10
+    assert agent.functions.api.appointments == {}
+
+
+class StubClient:
+    """Stands in for InferenceClient, returning a canned LLM response"""
+
+    def __init__(self, response):
+        self.response = response
+        self.prompts = []
+
+    def text_generation(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return self.response
+
+
+def test_llm_fallback_runs_read_only_tool_call(agent):
+    agent.client = StubClient('{"name": "search_patient", "arguments": {"query": "Priya Sharma"}}')
+
+    response = json.loads(agent.process_request("Who is Priya Sharma?"))
+
+    assert agent.client.prompts
+    assert response["patient_id"] == "P002"
+
+
+def test_llm_fallback_asks_to_confirm_booking(agent):
+    agent.client = StubClient(
+        '{"name": "book_appointment", "arguments": {"patient_id": "P002", "slot_id": "SLOT_ORT_2025122411"}}'
+    )
+
+    response = json.loads(agent.process_request("Hello, what can you do?"))
+
+    assert response["status"] == "CONFIRMATION_REQUIRED"
+    assert response["proposed_call"]["name"] == "book_appointment"
+    assert agent.functions.api.appointments == {}
+
+
+@pytest.mark.parametrize("llm_response", [
+    '{"name": "none", "arguments": {}}',
+    '{"name": "find_available_slots", "arguments": {"specialty": "cardio',
+])
+def test_llm_fallback_shows_help_without_a_usable_call(agent, llm_response):
+    agent.client = StubClient(llm_response)
+
+    response = agent.process_request("Hello, what can you do?")
+
+    assert "Available actions:" in response
+    assert agent.functions.api.appointments == {}
+
+
+def test_batched_bookings_of_one_slot_book_it_once(agent):
+    responses = agent.process_requests(["Book a cardiology appointment for P001"] * 8)
+
+    results = [json.loads(response)["book"] for response in responses]
+    assert sum(result.get("status") == "scheduled" for result in results) == 1
+    assert sum("already booked" in result.get("error", "") for result in results) == 7
+
+
+
+class StubAsyncClient:
+    """Stands in for AsyncInferenceClient, recording its lifetime and prompts"""
+
+    instances = []
+
+    def __init__(self, token=None):
+        self.prompts = []
+        self.closed = False
+        StubAsyncClient.instances.append(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.closed = True
+
+    async def text_generation(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return '{"name": "search_patient", "arguments": {"query": "Amit Patel"}}'
+
+
+@pytest.fixture
+def stub_async_client(monkeypatch):
+    StubAsyncClient.instances = []
+    monkeypatch.setattr(src.agent, "AsyncInferenceClient", StubAsyncClient)
+    return StubAsyncClient
+
+
+def test_async_batch_sends_only_unrouted_prompts_and_closes_client(agent, stub_async_client):
+    responses = agent.process_requests(["Who is Amit Patel?", "Search for Ravi Kumar"])
+
+    [client] = stub_async_client.instances
+    assert client.closed
+    assert len(client.prompts) == 1
+    assert client.prompts[0].endswith("Who is Amit Patel?")
+    assert json.loads(responses[0])["patient_id"] == "P003"
+    assert json.loads(responses[1])["search"]["patient_id"] == "P001"
+
+
+def test_async_batch_without_llm_requests_opens_no_client(agent, stub_async_client):
+    agent.process_requests(["Search for Ravi Kumar"])
+
+    assert stub_async_client.instances == []
@@ -0,0 +1,60 @@
+from src.logger import AuditLogger
+
+
+def test_unencodable_record_is_kept_and_later_records_still_written(tmp_path):
+    logger = AuditLogger(log_dir=str(tmp_path))
+
+    logger.log_action("X", "f", {("tuple", "key"): "unencodable"}, None)
+    logger.log_action("Y", "g", {"query": "Ravi"}, None)
+
+    first, second = logger.get_logs()
+    assert first["type"] == "log_serialization_error"
+    assert "unencodable" in first["record"]
+    assert second["action_type"] == "Y"
+
+
+def test_flush_and_close_stops_drain_thread(tmp_path):
+    logger = AuditLogger(log_dir=str(tmp_path))
+    logger.log_user_request("Search for patient Ravi Kumar")
+
+    logger._sink._flush_and_close()
+
+    assert not logger._sink._thread.is_alive()
+    with open(logger.log_file) as f:
+        assert "Search for patient Ravi Kumar" in f.read()
+
+
+def test_non_str_keys_and_wide_ints_are_logged_as_json(tmp_path):
+    logger = AuditLogger(log_dir=str(tmp_path))
+
+    logger.log_action("X", "f", {1: "int key"}, None)
+    logger.log_action("Y", "g", {"big": 2 ** 70 + 1}, None)
+
+    first, second = logger.get_logs()
+    assert first["parameters"] == {"1": "int key"}
+    assert second["parameters"] == {"big": 2 ** 70 + 1}
+
+
+def test_parameters_are_snapshotted_at_call_time(tmp_path):
+    logger = AuditLogger(log_dir=str(tmp_path))
+    parameters = {"query": "Ravi"}
+
+    logger.log_action("SEARCH", "search_patient", parameters, None)
+    parameters["query"] = "changed"
+
+    assert logger.get_logs()[-1]["parameters"] == {"query": "Ravi"}
+
+
+def test_relative_log_dir_follows_current_directory(tmp_path, monkeypatch):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+
+    monkeypatch.chdir(tmp_path / "a")
+    AuditLogger().log_user_request("first")
+
+    monkeypatch.chdir(tmp_path / "b")
+    logger = AuditLogger()
+    logger.log_user_request("second")
+
+    assert [entry["request"] for entry in logger.get_logs()] == ["second"]
+    assert logger.log_file.startswith(str(tmp_path / "b"))